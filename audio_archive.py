@@ -0,0 +1,215 @@
+"""
+Compressed on-disk archive of the live session's microphone audio.
+
+`MicrophoneTee` owns the microphone: every block it captures goes straight
+to the recognizer's push stream, and a copy is handed to `AudioArchiver`,
+which encodes FLAC chunks on its own thread. The hand-off never blocks, so
+archiving cannot add latency to recognition; if the disk falls behind,
+blocks are dropped from the archive (and the gap is recorded) rather than
+from the recognizer.
+
+Layout of a session directory (``audio/<session_id>/``):
+
+    chunk_0000.flac ...   mono 16 kHz FLAC, rotated by duration or size
+    index.jsonl           one line per chunk: file, offset_ms, duration_ms
+    captions.jsonl        one line per final result: offset_ms, duration_ms, text, translations
+
+Offsets are milliseconds from the start of the audio stream, which is the
+same clock Azure uses for `result.offset`, so a caption maps directly to
+its audio with `find_audio_span`.
+
+numpy, sounddevice and soundfile are only imported when archiving is
+actually started, so the overlay runs without them when it is off.
+"""
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+SAMPLE_RATE = 16000
+BLOCK_FRAMES = 320  # 20 ms per block keeps the recognizer fed with minimal delay
+TICKS_PER_MS = 10000  # Azure offsets/durations are in 100 ns ticks
+
+
+def new_session_dir(root="audio"):
+    session_id = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    path = os.path.join(root, session_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class AudioArchiver:
+    """Writes int16 PCM blocks to rotating FLAC chunks on a background thread."""
+
+    def __init__(self, session_dir, chunk_seconds=300, chunk_max_bytes=50 * 1024 * 1024,
+                 max_queued_blocks=500):
+        import numpy as np
+        import soundfile as sf
+        self._np = np
+        self._sf = sf
+        self.session_dir = session_dir
+        self.chunk_frames = chunk_seconds * SAMPLE_RATE
+        self.chunk_max_bytes = chunk_max_bytes
+        self.dropped_blocks = 0
+        self.failed = False
+        # Bounded: ~10 s of audio at the default block size
+        self._queue = queue.Queue(maxsize=max_queued_blocks)
+        self._chunk = None
+        self._chunk_path = None
+        self._chunk_start = 0
+        self._chunk_frames_written = 0
+        self._next_frame = None
+        self._chunk_count = 0
+        self._index = open(os.path.join(session_dir, "index.jsonl"), "a", encoding="utf-8")
+        self._captions = open(os.path.join(session_dir, "captions.jsonl"), "a", encoding="utf-8")
+        self._captions_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="AudioArchiver", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame_offset, pcm_bytes):
+        """Queue a block captured at `frame_offset`; never blocks the caller."""
+        if self.failed:
+            return
+        try:
+            self._queue.put_nowait((frame_offset, pcm_bytes))
+        except queue.Full:
+            self.dropped_blocks += 1
+
+    def add_caption(self, offset_ticks, duration_ticks, text, translations):
+        record = {
+            "offset_ms": offset_ticks // TICKS_PER_MS,
+            "duration_ms": duration_ticks // TICKS_PER_MS,
+            "text": text,
+            "translations": dict(translations),
+        }
+        with self._captions_lock:
+            self._captions.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._captions.flush()
+
+    def close(self, timeout=5.0):
+        # Never hang the caller (the Qt thread on Esc) on a stuck or dead writer
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print("⚠️ Audio archive writer not responding; closing without flushing")
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return  # the writer still owns the index; the daemon thread dies with the app
+        self._index.close()
+        with self._captions_lock:
+            self._captions.close()
+        if self.dropped_blocks and not self.failed:
+            print(f"⚠️ Audio archive dropped {self.dropped_blocks} blocks (disk too slow)")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.failed:
+                continue  # keep draining so submit() and close() never block
+            try:
+                self._write(*item)
+            except Exception as e:
+                print("❌ Audio archiving stopped:", e)
+                self.failed = True
+                self._abandon_chunk()
+        if self._chunk is not None:
+            try:
+                self._close_chunk()
+            except Exception as e:
+                print("❌ Audio archive could not finish the last chunk:", e)
+
+    def _write(self, frame_offset, pcm_bytes):
+        samples = self._np.frombuffer(pcm_bytes, dtype=self._np.int16)
+        # Start a fresh chunk after a gap so every chunk is contiguous audio
+        if self._chunk is not None and frame_offset != self._next_frame:
+            self._close_chunk()
+        if self._chunk is None:
+            self._open_chunk(frame_offset)
+        self._chunk.write(samples)
+        self._chunk_frames_written += len(samples)
+        self._next_frame = frame_offset + len(samples)
+        if self._chunk_frames_written >= self.chunk_frames or self._chunk_size() >= self.chunk_max_bytes:
+            self._close_chunk()
+
+    def _abandon_chunk(self):
+        chunk, self._chunk = self._chunk, None
+        if chunk is not None:
+            try:
+                chunk.close()
+            except Exception:
+                pass
+
+    def _chunk_size(self):
+        try:
+            return os.path.getsize(self._chunk_path)
+        except OSError:
+            return 0
+
+    def _open_chunk(self, frame_offset):
+        self._chunk_path = os.path.join(self.session_dir, f"chunk_{self._chunk_count:04d}.flac")
+        self._chunk = self._sf.SoundFile(self._chunk_path, "w", samplerate=SAMPLE_RATE, channels=1,
+                                   subtype="PCM_16", format="FLAC")
+        self._chunk_start = frame_offset
+        self._chunk_frames_written = 0
+        self._chunk_count += 1
+
+    def _close_chunk(self):
+        self._chunk.close()
+        record = {
+            "file": os.path.basename(self._chunk_path),
+            "offset_ms": self._chunk_start * 1000 // SAMPLE_RATE,
+            "duration_ms": self._chunk_frames_written * 1000 // SAMPLE_RATE,
+        }
+        self._index.write(json.dumps(record) + "\n")
+        self._index.flush()
+        self._chunk = None
+
+
+class MicrophoneTee:
+    """Captures the default microphone and feeds both the recognizer and the archiver."""
+
+    def __init__(self, push_stream, archiver):
+        import sounddevice as sd
+        self.push_stream = push_stream
+        self.archiver = archiver
+        self._frames = 0
+        self._stream = sd.RawInputStream(samplerate=SAMPLE_RATE, channels=1, dtype="int16",
+                                         blocksize=BLOCK_FRAMES, callback=self._on_audio)
+
+    def _on_audio(self, indata, frames, time_info, status):
+        pcm = bytes(indata)
+        self.push_stream.write(pcm)
+        self.archiver.submit(self._frames, pcm)
+        self._frames += frames
+
+    def start(self):
+        self._stream.start()
+
+    def stop(self):
+        self._stream.stop()
+        self._stream.close()
+        self.push_stream.close()
+        self.archiver.close()
+
+
+def find_audio_span(session_dir, offset_ms, duration_ms):
+    """
+    Return [(chunk_path, start_seconds, end_seconds), ...] covering a caption.
+
+    A caption can straddle a chunk boundary, so more than one piece may be returned.
+    """
+    end_ms = offset_ms + duration_ms
+    spans = []
+    with open(os.path.join(session_dir, "index.jsonl"), "r", encoding="utf-8") as f:
+        for line in f:
+            chunk = json.loads(line)
+            chunk_end = chunk["offset_ms"] + chunk["duration_ms"]
+            if chunk_end <= offset_ms or chunk["offset_ms"] >= end_ms:
+                continue
+            start = max(offset_ms, chunk["offset_ms"]) - chunk["offset_ms"]
+            stop = min(end_ms, chunk_end) - chunk["offset_ms"]
+            spans.append((os.path.join(session_dir, chunk["file"]), start / 1000, stop / 1000))
+    return spans
@@ -0,0 +1,203 @@
+"""
+Shared-memory caption bus for local consumers (OBS, recorders, ...).
+
+The overlay publishes every caption into a memory-mapped ring buffer; any
+number of local processes can read it with `CaptionBusReader`. There is a
+single writer and it never waits for readers: publishing is one slot write
+regardless of how many readers are attached. Readers that fall more than a
+ring's worth behind skip ahead and report how many captions they missed.
+
+File layout (all integers little-endian):
+
+    Header, 64 bytes
+        0   8s   magic  b"CAPBUS01"
+        8   u32  version (1)
+        12  u32  slot_count
+        16  u32  slot_size
+        20  u32  reserved
+        24  u64  session  (changes every time a writer starts)
+        32  u64  last_seq (sequence number of the newest complete record, 0 = none)
+        40  24x  reserved
+
+    Slot `(seq - 1) % slot_count`, slot_size bytes each
+        0   u64  seq      (0 while the slot is being rewritten)
+        8   u8   kind     (0 = partial, 1 = final)
+        9   7s   lang     (ASCII language code, NUL padded)
+        16  f64  timestamp (seconds since the epoch)
+        24  u32  length   (bytes of UTF-8 text that follow)
+        28  4x   reserved
+        32  ...  text
+        -8  u64  seq      (copy, written after the text)
+
+The writer zeroes the head seq, writes the fields and text, then the tail
+seq, then the head seq. Readers must check in the opposite order: read the
+tail seq first, then the fields and text, then the head seq last, and accept
+the record only if both equal the sequence number expected. Any other
+order can accept a record the writer overwrote mid-read.
+
+Usage as a consumer:
+    python caption_bus.py            # print captions as they arrive
+    python caption_bus.py --lang hi --finals-only
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+MAGIC = b"CAPBUS01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIQQ24x")
+SLOT_HEADER = struct.Struct("<QB7sdI4x")
+SEQ = struct.Struct("<Q")
+LAST_SEQ_OFFSET = 32
+
+KIND_PARTIAL = 0
+KIND_FINAL = 1
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "livetranslation_captions.bus")
+DEFAULT_SLOT_COUNT = 1024
+DEFAULT_SLOT_SIZE = 1024
+
+Caption = namedtuple("Caption", "seq kind lang timestamp text")
+
+
+class CaptionBusWriter:
+    """Publishes captions into the ring buffer. Only one writer per bus file."""
+
+    def __init__(self, path=DEFAULT_PATH, slot_count=DEFAULT_SLOT_COUNT, slot_size=DEFAULT_SLOT_SIZE):
+        self.path = path
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.max_text_bytes = slot_size - SLOT_HEADER.size - SEQ.size
+        self.seq = 0
+        size = HEADER.size + slot_count * slot_size
+        # Reuse an existing bus of the same size: readers may still have it mapped,
+        # and Windows refuses to truncate a mapped file
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, "wb") as f:
+                f.truncate(size)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._map[:HEADER.size] = HEADER.pack(MAGIC, VERSION, slot_count, slot_size, 0, time.time_ns(), 0)
+
+    def publish(self, text, lang, final=False):
+        data = text.encode("utf-8")
+        if len(data) > self.max_text_bytes:
+            # Keep the end of the line (like the overlay does) without splitting a character
+            data = data[-self.max_text_bytes:].decode("utf-8", "ignore").encode("utf-8")
+        self.seq += 1
+        start = HEADER.size + ((self.seq - 1) % self.slot_count) * self.slot_size
+        end = start + self.slot_size
+        m = self._map
+        # Invalidate the slot first so a concurrent reader cannot accept a half-written record
+        m[start:start + SEQ.size] = SEQ.pack(0)
+        m[start + SEQ.size:start + SLOT_HEADER.size] = SLOT_HEADER.pack(
+            0, KIND_FINAL if final else KIND_PARTIAL, lang.encode("ascii")[:7], time.time(), len(data)
+        )[SEQ.size:]
+        m[start + SLOT_HEADER.size:start + SLOT_HEADER.size + len(data)] = data
+        m[end - SEQ.size:end] = SEQ.pack(self.seq)
+        m[start:start + SEQ.size] = SEQ.pack(self.seq)
+        m[LAST_SEQ_OFFSET:LAST_SEQ_OFFSET + SEQ.size] = SEQ.pack(self.seq)
+        return self.seq
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class CaptionBusReader:
+    """Reads captions published by `CaptionBusWriter`, starting from the newest one."""
+
+    def __init__(self, path=DEFAULT_PATH, from_start=False):
+        self.path = path
+        self.missed = 0
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slot_count, self.slot_size, _, self.session, last_seq = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a caption bus (version {VERSION})")
+        self.next_seq = max(1, last_seq - self.slot_count + 1) if from_start else last_seq + 1
+
+    def poll(self):
+        """Return the captions published since the last call (possibly an empty list)."""
+        session, last_seq = struct.unpack_from("<QQ", self._map, 24)
+        if session != self.session or last_seq < self.next_seq - 1:
+            # The writer restarted and began numbering from 1 again
+            self.session = session
+            self.next_seq = 1
+        oldest = last_seq - self.slot_count + 1
+        if self.next_seq < oldest:
+            self.missed += oldest - self.next_seq
+            self.next_seq = oldest
+
+        captions = []
+        while self.next_seq <= last_seq:
+            caption = self._read(self.next_seq)
+            if caption is None:
+                self.missed += 1
+            else:
+                captions.append(caption)
+            self.next_seq += 1
+        return captions
+
+    def follow(self, interval=0.05):
+        """Yield captions forever, polling every `interval` seconds."""
+        while True:
+            captions = self.poll()
+            if not captions:
+                time.sleep(interval)
+            yield from captions
+
+    def _read(self, seq):
+        start = HEADER.size + ((seq - 1) % self.slot_count) * self.slot_size
+        end = start + self.slot_size
+        # Reverse of the writer's order: tail, body, then head (see module docstring)
+        (tail_seq,) = SEQ.unpack_from(self._map, end - SEQ.size)
+        if tail_seq != seq:
+            return None
+        _, kind, lang, timestamp, length = SLOT_HEADER.unpack_from(self._map, start)
+        length = min(length, self.slot_size - SLOT_HEADER.size - SEQ.size)
+        text = self._map[start + SLOT_HEADER.size:start + SLOT_HEADER.size + length]
+        (head_seq,) = SEQ.unpack_from(self._map, start)
+        if head_seq != seq:
+            return None
+        return Caption(seq, kind, lang.rstrip(b"\0").decode("ascii"), timestamp,
+                       text.decode("utf-8", "replace"))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print captions from the live translation caption bus.")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--lang", help="Only show this language code")
+    parser.add_argument("--finals-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"❌ No caption bus at {args.path} (is the overlay running?)")
+        return 1
+    reader = CaptionBusReader(args.path)
+    try:
+        for caption in reader.follow():
+            if args.lang and caption.lang != args.lang:
+                continue
+            if args.finals_only and caption.kind != KIND_FINAL:
+                continue
+            print(f"{time.strftime('%H:%M:%S', time.localtime(caption.timestamp))} → {caption.text}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Spoken translation (dubbing) of finalized captions.
+
+`DubbingPipeline.submit()` is called from the recognizer callback and only
+appends to a queue, so captions are never held up by audio. A dispatcher
+thread starts synthesis on a worker pool as soon as a segment arrives (up to
+`lookahead` segments ahead of playback), so the next segment is ready by the
+time the current one finishes playing.
+
+When playback falls behind the speaker, segments older than `max_lag_seconds`
+are dropped and short queued segments are merged into one utterance, which
+saves the per-request latency and leading/trailing silence of each one.
+Synthesized audio is cached, so repeated phrases are only synthesized once.
+
+`AzureSynthesizer` + `SpeakerPlayer` are used in the app; `ToneSynthesizer` +
+`SilentPlayer` stand in for them when trying the pipeline without Azure or
+a sound card; the Azure SDK and audio packages are only imported by the
+classes that need them.
+"""
+import io
+import math
+import queue
+import struct
+import threading
+import time
+import wave
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import CancelledError, Future
+
+# Neural voices for the target languages; others fall back to the service's default voice
+VOICES = {
+    "bn": "bn-IN-TanishaaNeural",
+    "en": "en-IN-NeerjaNeural",
+    "gu": "gu-IN-DhwaniNeural",
+    "hi": "hi-IN-SwaraNeural",
+    "kn": "kn-IN-SapnaNeural",
+    "ml": "ml-IN-SobhanaNeural",
+    "mr": "mr-IN-AarohiNeural",
+    "ta": "ta-IN-PallaviNeural",
+    "te": "te-IN-ShrutiNeural",
+    "ur": "ur-IN-GulNeural",
+}
+
+Segment = namedtuple("Segment", "text lang submitted_at")
+
+
+# =========================
+# Synthesizers
+# =========================
+
+class AzureSynthesizer:
+    """Azure text-to-speech returning 16 kHz mono WAV bytes. One SDK synthesizer per worker thread."""
+
+    def __init__(self, speech_key, region):
+        import azure.cognitiveservices.speech as speechsdk
+        self._sdk = speechsdk
+        self.speech_key = speech_key
+        self.region = region
+        self._local = threading.local()
+
+    def _synthesizer(self, lang):
+        synthesizers = getattr(self._local, "synthesizers", None)
+        if synthesizers is None:
+            synthesizers = self._local.synthesizers = {}
+        if lang not in synthesizers:
+            speechsdk = self._sdk
+            config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.region)
+            config.set_speech_synthesis_output_format(
+                speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm)
+            if lang in VOICES:
+                config.speech_synthesis_voice_name = VOICES[lang]
+            else:
+                config.speech_synthesis_language = lang
+            # audio_config=None keeps the audio in memory instead of playing it
+            synthesizers[lang] = speechsdk.SpeechSynthesizer(speech_config=config, audio_config=None)
+        return synthesizers[lang]
+
+    def synthesize(self, text, lang):
+        result = self._synthesizer(lang).speak_text_async(text).get()
+        if result.reason != self._sdk.ResultReason.SynthesizingAudioCompleted:
+            details = result.cancellation_details
+            raise RuntimeError(f"Synthesis failed: {details.reason} {details.error_details}")
+        return result.audio_data
+
+
+class ToneSynthesizer:
+    """Stand-in synthesizer: a short beep per word, no network needed."""
+
+    def __init__(self, sample_rate=16000, seconds_per_word=0.25, delay=0.0):
+        self.sample_rate = sample_rate
+        self.seconds_per_word = seconds_per_word
+        self.delay = delay  # simulated service latency
+
+    def synthesize(self, text, lang):
+        if self.delay:
+            time.sleep(self.delay)
+        frames = int(self.sample_rate * self.seconds_per_word * max(1, len(text.split())))
+        samples = (int(8000 * math.sin(2 * math.pi * 440 * i / self.sample_rate)) for i in range(frames))
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(struct.pack(f"<{frames}h", *samples))
+        return buffer.getvalue()
+
+
+# =========================
+# Players
+# =========================
+
+def wav_duration(audio):
+    with wave.open(io.BytesIO(audio), "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+class SpeakerPlayer:
+    """Plays WAV bytes on the default output device, blocking until done."""
+
+    def __init__(self):
+        import numpy as np
+        import sounddevice as sd
+        self._np = np
+        self._sd = sd
+
+    def play(self, audio):
+        with wave.open(io.BytesIO(audio), "rb") as w:
+            rate = w.getframerate()
+            samples = self._np.frombuffer(w.readframes(w.getnframes()), dtype=self._np.int16)
+        self._sd.play(samples, rate, blocking=True)
+
+    def stop(self):
+        self._sd.stop()
+
+
+class SilentPlayer:
+    """Stand-in player: waits for as long as the audio would play and records what was played."""
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, audio):
+        self.played.append(audio)
+        time.sleep(wav_duration(audio))
+
+    def stop(self):
+        pass
+
+
+# =========================
+# Pipeline
+# =========================
+
+class DubbingPipeline:
+    def __init__(self, synthesizer, player, workers=2, lookahead=2, max_lag_seconds=8.0,
+                 merge_max_chars=200, cache_size=256):
+        self.synthesizer = synthesizer
+        self.player = player
+        self.lookahead = lookahead
+        self.max_lag_seconds = max_lag_seconds
+        self.merge_max_chars = merge_max_chars
+        self.cache_size = cache_size
+        self.stats = {"submitted": 0, "played": 0, "dropped": 0, "merged": 0, "cache_hits": 0}
+        self._pending = deque()  # submitted, synthesis not started yet
+        self._ready = deque()  # (segment, future) in playback order, synthesis started
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._condition = threading.Condition()  # also guards self.stats
+        self._running = True
+        # Daemon workers rather than ThreadPoolExecutor, whose threads hold up interpreter exit
+        # until an in-flight synthesis returns
+        self._jobs = queue.Queue()
+        self._workers = [threading.Thread(target=self._work, name=f"DubbingSynth-{i}", daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="DubbingDispatch", daemon=True)
+        self._dispatcher.start()
+        self._thread = threading.Thread(target=self._run, name="DubbingPlayback", daemon=True)
+        self._thread.start()
+
+    def submit(self, text, lang):
+        """Queue a finalized caption for speech. Returns immediately."""
+        if not text:
+            return
+        with self._condition:
+            self._pending.append(Segment(text, lang, time.monotonic()))
+            self.stats["submitted"] += 1
+            self._condition.notify_all()
+
+    def close(self, timeout=1.0):
+        """Stop speaking. Never waits longer than `timeout` for a synthesis or playback in progress."""
+        with self._condition:
+            self._running = False
+            self._pending.clear()
+            for _, future in self._ready:
+                future.cancel()
+            self._ready.clear()
+            self._condition.notify_all()
+        while True:
+            try:
+                _, future = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+        for _ in self._workers:
+            self._jobs.put(None)
+        self.player.stop()
+        deadline = time.monotonic() + timeout
+        for thread in (self._dispatcher, self._thread):
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _is_stale(self, segment):
+        return time.monotonic() - segment.submitted_at > self.max_lag_seconds
+
+    def _take(self):
+        """Next segment to synthesize: stale ones dropped, short consecutive ones merged. Caller holds the lock."""
+        while self._pending and self._is_stale(self._pending[0]):
+            self._pending.popleft()
+            self.stats["dropped"] += 1
+        if not self._pending:
+            return None
+        segment = self._pending.popleft()
+        while self._pending:
+            nxt = self._pending[0]
+            if nxt.lang != segment.lang or len(segment.text) + len(nxt.text) + 1 > self.merge_max_chars:
+                break
+            self._pending.popleft()
+            # Keep the newer timestamp so a merged segment is not dropped for its oldest part
+            segment = Segment(f"{segment.text} {nxt.text}", segment.lang, nxt.submitted_at)
+            self.stats["merged"] += 1
+        return segment
+
+    def _synthesize(self, segment):
+        key = (segment.lang, segment.text)
+        with self._cache_lock:
+            audio = self._cache.get(key)
+            if audio is not None:
+                self._cache.move_to_end(key)
+        if audio is not None:
+            self._count("cache_hits")
+            return audio
+        audio = self.synthesizer.synthesize(segment.text, segment.lang)
+        with self._cache_lock:
+            self._cache[key] = audio
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return audio
+
+    def _count(self, stat):
+        with self._condition:
+            self.stats[stat] += 1
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            segment, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._synthesize(segment))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _start_synthesis(self, segment):
+        future = Future()
+        self._jobs.put((segment, future))
+        return future
+
+    def _dispatch(self):
+        """Start synthesis as soon as a segment arrives, up to `lookahead` segments ahead of playback."""
+        while True:
+            with self._condition:
+                while self._running and not (self._pending and len(self._ready) < self.lookahead):
+                    self._condition.wait()
+                if not self._running:
+                    return
+                segment = self._take()
+                if segment is None:
+                    continue
+                self._ready.append((segment, self._start_synthesis(segment)))
+                self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._ready:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                segment, future = self._ready.popleft()
+                # Frees a lookahead slot so the dispatcher starts the next synthesis while this one plays
+                self._condition.notify_all()
+            try:
+                audio = future.result()
+            except CancelledError:
+                return
+            except Exception as e:
+                print("❌ Dubbing synthesis failed:", e)
+                continue
+            if not self._running:
+                return
+            if self._is_stale(segment):
+                self._count("dropped")
+                continue
+            try:
+                self.player.play(audio)
+                self._count("played")
+            except Exception as e:
+                print("❌ Dubbing playback failed:", e)
@@ -0,0 +1,177 @@
+"""
+Domain glossary applied to translated captions.
+
+Staff keep a tab-separated glossary of preferred renderings for institution
+names, ranks, course titles and so on:
+
+    # lang  term                          replacement
+    hi      लाल बहादुर शास्त्री अकादमी      लाल बहादुर शास्त्री राष्ट्रीय प्रशासन अकादमी
+    en      Lal Bahadur Shastri Academy   LBSNAA
+    *       I.A.S.                        IAS
+
+`lang` is a target language code, or `*` for every language. Matching is
+case-sensitive, whole-word, and leftmost-longest, so a longer term wins over
+a shorter one it contains.
+
+All terms for a language are compiled into one Aho-Corasick automaton, so a
+caption is rewritten in a single pass over its characters no matter how many
+terms the glossary has. The file is watched and recompiled on a background
+thread when it changes; captions keep using the previous automaton until the
+new one is ready.
+"""
+import os
+import threading
+import unicodedata
+from collections import deque
+
+WILDCARD_LANG = "*"
+
+
+def _is_word_char(ch):
+    # Count combining marks (Devanagari matras, viramas, ...) as part of a word
+    return ch.isalnum() or unicodedata.category(ch)[0] == "M"
+
+
+class TermAutomaton:
+    """Aho-Corasick automaton over a {term: replacement} mapping."""
+
+    def __init__(self, terms):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]  # per state: ((length, replacement), ...) for every term ending here
+        for term, replacement in terms.items():
+            if term:
+                self._add(term, replacement)
+        self._link()
+
+    def __len__(self):
+        return len(self._goto)
+
+    def _add(self, term, replacement):
+        state = 0
+        for ch in term:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = ((len(term), replacement),)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while ch not in self._goto[fallback] and fallback:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Fold the suffix's matches in so the scan never walks output links
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def replace(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        matches = []
+        for i, ch in enumerate(text):
+            while ch not in goto[state] and state:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, replacement in out[state]:
+                matches.append((i + 1 - length, -length, replacement))
+        if not matches:
+            return text
+
+        matches.sort()
+        pieces = []
+        last = 0
+        for start, neg_length, replacement in matches:
+            end = start - neg_length
+            if start < last:
+                continue
+            if (start > 0 and _is_word_char(text[start - 1])) or (end < len(text) and _is_word_char(text[end])):
+                continue
+            pieces.append(text[last:start])
+            pieces.append(replacement)
+            last = end
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+
+def load_glossary(path):
+    """Parse a glossary file into {lang: {term: replacement}}."""
+    by_lang = {}
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            parts = line.split("\t")
+            if len(parts) != 3:
+                print(f"⚠️ Skipping malformed glossary line: {line!r}")
+                continue
+            lang, term, replacement = (part.strip() for part in parts)
+            by_lang.setdefault(lang, {})[term] = replacement
+    return by_lang
+
+
+def compile_glossary(by_lang):
+    """Build one automaton per language, with `*` entries merged into each."""
+    shared = by_lang.get(WILDCARD_LANG, {})
+    automata = {}
+    for lang, terms in by_lang.items():
+        if lang != WILDCARD_LANG:
+            automata[lang] = TermAutomaton({**shared, **terms})
+    automata[WILDCARD_LANG] = TermAutomaton(shared)
+    return automata
+
+
+class Glossary:
+    """Applies the glossary at `path` and recompiles it whenever the file changes."""
+
+    def __init__(self, path="glossary.tsv", poll_seconds=2.0):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._automata = {}
+        self._mtime = None
+        self._stop = threading.Event()
+        self.reload()
+        self._thread = threading.Thread(target=self._watch, name="GlossaryWatcher", daemon=True)
+        self._thread.start()
+
+    def apply(self, text, lang):
+        automata = self._automata
+        automaton = automata.get(lang) or automata.get(WILDCARD_LANG)
+        if automaton is None or not text:
+            return text
+        return automaton.replace(text)
+
+    def reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        by_lang = load_glossary(self.path) if mtime is not None else {}
+        # Swap the whole mapping at once so apply() never sees a half-built glossary
+        self._automata = compile_glossary(by_lang) if by_lang else {}
+        if by_lang:
+            count = sum(len(terms) for terms in by_lang.values())
+            print(f"📖 Glossary loaded: {count} terms from {self.path}")
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload()
+            except Exception as e:
+                print("❌ Glossary reload failed:", e)
+
+    def close(self):
+        self._stop.set()
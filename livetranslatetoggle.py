@@ -6,10 +6,16 @@ from PyQt5.QtCore import Qt, QEvent
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout,
-    QComboBox, QSpinBox, QPushButton, QDialog, QSlider, QMessageBox
+    QComboBox, QSpinBox, QPushButton, QDialog, QSlider, QMessageBox,
+    QHBoxLayout, QListWidget, QCheckBox
 )
 import azure.cognitiveservices.speech as speechsdk
 
+from audio_archive import AudioArchiver, MicrophoneTee, SAMPLE_RATE, new_session_dir
+from caption_bus import CaptionBusWriter
+from dubbing import AzureSynthesizer, DubbingPipeline, SpeakerPlayer
+from glossary import Glossary
+
 # =========================
 # Language Mappings
 # =========================
@@ -51,6 +57,8 @@ INDIAN_LANG_CODES = {
 
 PLACEMENT_OPTIONS = ["Bottom", "Top"]  # NEW
 
+LANG_NAMES = {code: name for name, code in INDIAN_LANG_CODES.items()}
+
 
 # =========================
 # Settings Dialog
@@ -97,6 +105,12 @@ class LanguageSelectionDialog(QDialog):
         layout.addWidget(QLabel("Translation Placement:"))
         layout.addWidget(self.placement_selector)
 
+        self.archive_audio_checkbox = QCheckBox("Archive microphone audio")
+        layout.addWidget(self.archive_audio_checkbox)
+
+        self.dubbing_checkbox = QCheckBox("Speak translation aloud")
+        layout.addWidget(self.dubbing_checkbox)
+
         self.ok_button = QPushButton("Start")
         self.ok_button.clicked.connect(self.accept)
         layout.addWidget(self.ok_button)
@@ -108,7 +122,60 @@ class LanguageSelectionDialog(QDialog):
         font_color = self.font_color_selector.currentText().lower()
         opacity_percent = self.opacity_slider.value()
         placement = self.placement_selector.currentText()  # NEW
-        return source, target, font_size, font_color, opacity_percent, placement
+        archive_audio = self.archive_audio_checkbox.isChecked()
+        dubbing = self.dubbing_checkbox.isChecked()
+        return source, target, font_size, font_color, opacity_percent, placement, archive_audio, dubbing
+
+
+# =========================
+# Language Control Panel
+# =========================
+
+class LanguageControlPanel(QWidget):
+    """Add/remove translation languages and pick the displayed one while the session runs."""
+
+    def __init__(self, overlay):
+        super().__init__()
+        self.overlay = overlay
+        self.setWindowTitle("Translation Languages")
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool)
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Active languages (click to display):"))
+        self.active_list = QListWidget()
+        self.active_list.itemClicked.connect(
+            lambda item: self.overlay.set_display_language(item.data(Qt.UserRole)))
+        layout.addWidget(self.active_list)
+
+        row = QHBoxLayout()
+        self.lang_selector = QComboBox()
+        self.lang_selector.addItems(INDIAN_LANG_CODES.keys())
+        row.addWidget(self.lang_selector)
+        add_button = QPushButton("Add")
+        add_button.clicked.connect(
+            lambda: self.overlay.add_target_language(INDIAN_LANG_CODES[self.lang_selector.currentText()]))
+        row.addWidget(add_button)
+        layout.addLayout(row)
+
+        remove_button = QPushButton("Remove selected")
+        remove_button.clicked.connect(self.remove_selected)
+        layout.addWidget(remove_button)
+
+        self.refresh()
+
+    def remove_selected(self):
+        item = self.active_list.currentItem()
+        if item is not None:
+            self.overlay.remove_target_language(item.data(Qt.UserRole))
+
+    def refresh(self):
+        self.active_list.clear()
+        for code in self.overlay.target_lang_codes:
+            label = LANG_NAMES.get(code, code)
+            if code == self.overlay.target_lang_code:
+                label += "  (displayed)"
+            self.active_list.addItem(label)
+            self.active_list.item(self.active_list.count() - 1).setData(Qt.UserRole, code)
 
 
 # =========================
@@ -116,14 +183,25 @@ class LanguageSelectionDialog(QDialog):
 # =========================
 
 class InstantOverlay(QWidget):
-    def __init__(self, source_lang_code, target_lang_code, font_size, font_color, bg_opacity_percent, placement):
+    def __init__(self, source_lang_code, target_lang_code, font_size, font_color, bg_opacity_percent, placement,
+                 archive_audio=False, dubbing=False):
         super().__init__()
         self.source_lang_code = source_lang_code
-        self.target_lang_code = target_lang_code
+        self.target_lang_code = target_lang_code  # language currently displayed and logged
+        self.target_lang_codes = [target_lang_code]  # every language the recognizer translates to
+        self.last_translations = {}
+        self.control_panel = None
+        self.caption_bus = CaptionBusWriter()
+        self.glossary = Glossary()
         self.font_size = font_size
         self.font_color = font_color
         self.bg_opacity_percent = bg_opacity_percent
         self.placement = placement  # "Top" or "Bottom"
+        self.archive_audio = archive_audio
+        self.archiver = None
+        self.microphone = None
+        self.dubbing_enabled = dubbing
+        self.dubbing = None
 
         # Window styling & behavior
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
@@ -144,7 +222,8 @@ class InstantOverlay(QWidget):
         self.label = QLabel("", self)
         self.label.setStyleSheet(f"color: {self.font_color}; background-color: {rgba_style};")
         self.label.setFont(QFont("Arial", self.font_size))
-        self.label.setToolTip("Press 'T' to toggle Top/Bottom. Press 'Esc' to exit.")
+        self.label.setToolTip("Press 'T' to toggle Top/Bottom, 'L' to switch language, "
+                              "'C' for the language panel. Press 'Esc' to exit.")
         layout.addWidget(self.label)
 
         self.installEventFilter(self)
@@ -174,6 +253,63 @@ class InstantOverlay(QWidget):
         with open(log_file, "a", encoding="utf-8") as f:
             f.write(f"{datetime.now().strftime('%H:%M:%S')} → {new_text}\n")
 
+    def show_translations(self, translations, final=False):
+        """Apply the glossary, remember every language's translation, publish them, and display the selected one."""
+        self.last_translations = {lang: self.glossary.apply(text, lang) for lang, text in translations.items()}
+        for lang, text in self.last_translations.items():
+            self.caption_bus.publish(text, lang, final)
+        translated = self.last_translations.get(self.target_lang_code)
+        if translated:
+            self.update_text(translated)
+
+    def set_display_language(self, code):
+        if code not in self.target_lang_codes:
+            return
+        self.target_lang_code = code
+        # Show the current utterance straight away rather than waiting for the next event
+        translated = self.last_translations.get(code)
+        if translated:
+            self.update_text(translated)
+        self.refresh_control_panel()
+
+    def cycle_display_language(self):
+        index = self.target_lang_codes.index(self.target_lang_code)
+        self.set_display_language(self.target_lang_codes[(index + 1) % len(self.target_lang_codes)])
+
+    def add_target_language(self, code):
+        """Start translating into `code` on the running recognizer; no reconnect needed."""
+        if code in self.target_lang_codes:
+            self.set_display_language(code)
+            return
+        if hasattr(self, "recognizer"):
+            self.recognizer.add_target_language(code)
+        self.target_lang_codes.append(code)
+        self.set_display_language(code)
+
+    def remove_target_language(self, code):
+        if code not in self.target_lang_codes or len(self.target_lang_codes) == 1:
+            return
+        if hasattr(self, "recognizer"):
+            self.recognizer.remove_target_language(code)
+        self.target_lang_codes.remove(code)
+        if code == self.target_lang_code:
+            self.set_display_language(self.target_lang_codes[0])
+        else:
+            self.refresh_control_panel()
+
+    def toggle_control_panel(self):
+        if self.control_panel is None:
+            self.control_panel = LanguageControlPanel(self)
+        if self.control_panel.isVisible():
+            self.control_panel.hide()
+        else:
+            self.control_panel.refresh()
+            self.control_panel.show()
+
+    def refresh_control_panel(self):
+        if self.control_panel is not None:
+            self.control_panel.refresh()
+
     def eventFilter(self, source, event):
         if event.type() == QEvent.KeyPress:
             if event.key() == Qt.Key_Escape:
@@ -186,11 +322,26 @@ class InstantOverlay(QWidget):
                 self.placement = "Top" if self.placement == "Bottom" else "Bottom"
                 self.setup_geometry()
                 return True
+            elif event.key() == Qt.Key_L:
+                self.cycle_display_language()
+                return True
+            elif event.key() == Qt.Key_C:
+                self.toggle_control_panel()
+                return True
         return super().eventFilter(source, event)
 
     def closeEvent(self, event):
         if hasattr(self, "recognizer"):
             self.recognizer.stop_continuous_recognition()
+        if self.microphone is not None:
+            self.microphone.stop()
+            self.microphone = None
+        if self.control_panel is not None:
+            self.control_panel.close()
+        self.caption_bus.close()
+        if self.dubbing is not None:
+            self.dubbing.close()
+        self.glossary.close()
         event.accept()
 
     def start_translation(self):
@@ -210,7 +361,24 @@ class InstantOverlay(QWidget):
         config.speech_recognition_language = self.source_lang_code
         config.add_target_language(self.target_lang_code)
 
-        audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
+        if self.dubbing_enabled:
+            self.dubbing = DubbingPipeline(AzureSynthesizer(speech_key, region), SpeakerPlayer())
+
+        audio_config = None
+        if self.archive_audio:
+            try:
+                audio_config = self.start_audio_archive()
+            except Exception as e:
+                print("❌ Could not start audio archiving:", e)
+                QMessageBox.warning(self, "Audio Archiving Unavailable",
+                                    f"Could not open the microphone for archiving ({e}).\n"
+                                    "Continuing without archiving.")
+                if self.archiver is not None:
+                    self.archiver.close()
+                self.archiver = None
+                self.microphone = None
+        if audio_config is None:
+            audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
 
         recognizer = speechsdk.translation.TranslationRecognizer(
             translation_config=config,
@@ -218,15 +386,16 @@ class InstantOverlay(QWidget):
         )
 
         def on_partial_result(evt):
-            translated = evt.result.translations.get(self.target_lang_code)
-            if translated:
-                self.update_text(translated)
+            self.show_translations(evt.result.translations)
 
         def on_result(evt):
             if evt.result.reason == speechsdk.ResultReason.TranslatedSpeech:
-                translated = evt.result.translations.get(self.target_lang_code)
-                if translated:
-                    self.update_text(translated)
+                self.show_translations(evt.result.translations, final=True)
+                if self.dubbing is not None:
+                    self.dubbing.submit(self.last_translations.get(self.target_lang_code), self.target_lang_code)
+                if self.archiver is not None:
+                    self.archiver.add_caption(evt.result.offset, evt.result.duration,
+                                              evt.result.text, self.last_translations)
 
         recognizer.recognizing.connect(on_partial_result)
         recognizer.recognized.connect(on_result)
@@ -237,6 +406,21 @@ class InstantOverlay(QWidget):
         recognizer.start_continuous_recognition()
         self.recognizer = recognizer
 
+    def start_audio_archive(self):
+        """Capture the mic ourselves so the same audio feeds both the recognizer and the archive."""
+        stream_format = speechsdk.audio.AudioStreamFormat(samples_per_second=SAMPLE_RATE,
+                                                          bits_per_sample=16, channels=1)
+        push_stream = speechsdk.audio.PushAudioInputStream(stream_format)
+        session_dir = new_session_dir()
+        self.archiver = AudioArchiver(session_dir)
+        microphone = MicrophoneTee(push_stream, self.archiver)
+        # Start now so a device that rejects 16 kHz mono fails here, before the recognizer exists;
+        # audio pushed before recognition starts is buffered, so offsets still line up
+        microphone.start()
+        self.microphone = microphone
+        print(f"🎙️ Archiving audio to {session_dir}")
+        return speechsdk.audio.AudioConfig(stream=push_stream)
+
 
 # =========================
 # Main
@@ -246,7 +430,7 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     dialog = LanguageSelectionDialog()
     if dialog.exec_() == QDialog.Accepted:
-        source, target, font_size, font_color, opacity, placement = dialog.get_selections()
-        overlay = InstantOverlay(source, target, font_size, font_color, opacity, placement)
+        source, target, font_size, font_color, opacity, placement, archive_audio, dubbing = dialog.get_selections()
+        overlay = InstantOverlay(source, target, font_size, font_color, opacity, placement, archive_audio, dubbing)
         overlay.show()
     sys.exit(app.exec_())
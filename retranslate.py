@@ -0,0 +1,398 @@
+"""
+Offline re-translation of archived transcripts.
+
+Reads a daily transcript written by the overlay (``{date}_{lang}.txt``),
+collapses the chains of partial results down to the finished utterances,
+and translates them into one or more other languages. Output files keep the
+original timestamps so they line up with the source transcript.
+
+Usage:
+    python retranslate.py 2025-09-10_hi.txt --to en ta
+    python retranslate.py 2025-09-10_hi.txt --to en --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib import error, request
+
+LINE_SEPARATOR = " → "
+
+# Azure puts sentence punctuation on final results only, partials never have it
+TERMINAL_PUNCTUATION = ("।", ".", "?", "!", "॥", "؟", "۔")
+
+# Partials arrive every second or so; a longer silence after one means the chain was dropped
+PARTIAL_GAP_SECONDS = 3
+
+# Loose rewrites of a partial (new words, not just appended ones) arrive almost immediately
+REVISION_GAP_SECONDS = 1
+
+TRANSLATOR_ENDPOINT = "https://api.cognitive.microsofttranslator.com/translate"
+
+# Per-request limits of Translator v3; characters are counted once per target language
+MAX_REQUEST_CHARS = 50000
+MAX_REQUEST_ELEMENTS = 1000
+
+# Throttling and transient server errors are retried; anything else fails the run
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+# =========================
+# Transcript Parsing
+# =========================
+
+def iter_entries(path):
+    """Yield (timestamp, text) for every line of a transcript, one line at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            timestamp, sep, text = line.partition(LINE_SEPARATOR)
+            text = text.strip()
+            if not sep or not text:
+                continue
+            yield timestamp.strip(), text
+
+
+def _core(text):
+    return text.rstrip("".join(TERMINAL_PUNCTUATION) + " ")
+
+
+def _tokens(text):
+    return [t for t in (w.strip("".join(TERMINAL_PUNCTUATION) + ",;:") for w in text.split()) if t]
+
+
+def _common_prefix_length(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _seconds(timestamp):
+    try:
+        h, m, s = (int(part) for part in timestamp.split(":"))
+    except ValueError:
+        return None
+    return h * 3600 + m * 60 + s
+
+
+def _is_revision(previous, current, gap):
+    """
+    Whether `current` supersedes the unfinished line `previous`.
+
+    Extending or trimming the line, or keeping every word of it ("सुप्रभात" ->
+    "सबको सुप्रभात।"), counts as a revision at any gap up to PARTIAL_GAP_SECONDS.
+    Looser rewrites ("यहन" -> "यह एक फाइनल है", "यह एक फाइनल है" -> "यह अंतिम टेस्ट है")
+    only count when they arrive within REVISION_GAP_SECONDS and still share
+    half of the earlier line, either as a common prefix or as words.
+    """
+    if gap is not None and gap > PARTIAL_GAP_SECONDS:
+        return False
+    prev_core, cur_core = _core(previous), _core(current)
+    if not prev_core or cur_core.startswith(prev_core) or prev_core.startswith(cur_core):
+        return True
+    prev_tokens = _tokens(previous)
+    cur_tokens = set(_tokens(current))
+    shared = sum(t in cur_tokens for t in prev_tokens) / max(1, len(prev_tokens))
+    if shared == 1:
+        return True
+    if gap is not None and gap > REVISION_GAP_SECONDS:
+        return False
+    prefix = _common_prefix_length(prev_core, cur_core) / len(prev_core)
+    return shared >= 0.5 or prefix >= 0.5
+
+
+def iter_utterances(entries):
+    """
+    Collapse partial chains into final utterances.
+
+    Yields (timestamp, text) where the timestamp is that of the first partial,
+    i.e. when the utterance started being shown on screen.
+    """
+    start = None
+    latest = None
+    latest_seconds = None
+    for timestamp, text in entries:
+        seconds = _seconds(timestamp)
+        gap = None
+        if seconds is not None and latest_seconds is not None:
+            gap = (seconds - latest_seconds) % 86400
+        latest_seconds = seconds
+        if latest is not None and not _is_revision(latest, text, gap):
+            # Chain was abandoned without a punctuated final (e.g. session stopped)
+            yield start, latest
+            start = None
+        if start is None:
+            start = timestamp
+        latest = text
+        if text.endswith(TERMINAL_PUNCTUATION):
+            yield start, text
+            start, latest = None, None
+    if latest is not None:
+        yield start, latest
+
+
+# =========================
+# Translators
+# =========================
+
+def request_chunks(texts, target_count, max_chars=MAX_REQUEST_CHARS, max_elements=MAX_REQUEST_ELEMENTS):
+    """Split `texts` so that each request stays within Azure's limits across all targets."""
+    chunk, chars = [], 0
+    for text in texts:
+        cost = len(text) * target_count
+        if chunk and (chars + cost > max_chars or len(chunk) >= max_elements):
+            yield chunk
+            chunk, chars = [], 0
+        chunk.append(text)
+        chars += cost
+    if chunk:
+        yield chunk
+
+
+class AzureTextTranslator:
+    """Azure Translator (text) client; one request translates a batch into every target."""
+
+    def __init__(self, key, region, endpoint=TRANSLATOR_ENDPOINT, timeout=30, retries=5, backoff=1.0):
+        self.key = key
+        self.region = region
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def translate(self, texts, source, targets):
+        result = {t: [] for t in targets}
+        for chunk in request_chunks(texts, len(targets)):
+            for target, translations in self._translate_request(chunk, source, targets).items():
+                result[target].extend(translations)
+        return result
+
+    def _translate_request(self, texts, source, targets):
+        params = [("api-version", "3.0")] + [("to", t) for t in targets]
+        if source:
+            params.append(("from", source))
+        query = "&".join(f"{k}={v}" for k, v in params)
+        req = request.Request(
+            f"{self.endpoint}?{query}",
+            data=json.dumps([{"Text": t} for t in texts]).encode("utf-8"),
+            headers={
+                "Ocp-Apim-Subscription-Key": self.key,
+                "Ocp-Apim-Subscription-Region": self.region,
+                "Content-Type": "application/json; charset=UTF-8",
+                "X-ClientTraceId": str(uuid.uuid4()),
+            },
+            method="POST",
+        )
+        body = self._send(req)
+
+        result = {t: [] for t in targets}
+        for item in body:
+            for translation in item["translations"]:
+                result[translation["to"]].append(translation["text"])
+        return result
+
+    def _send(self, req):
+        """POST with exponential backoff on throttling/transient errors, honouring Retry-After."""
+        for attempt in range(self.retries + 1):
+            try:
+                with request.urlopen(req, timeout=self.timeout) as resp:
+                    return json.loads(resp.read().decode("utf-8"))
+            except error.HTTPError as e:
+                if e.code not in RETRYABLE_STATUS or attempt == self.retries:
+                    raise
+                delay = self._retry_after(e.headers.get("Retry-After"))
+            except (error.URLError, TimeoutError):
+                if attempt == self.retries:
+                    raise
+                delay = None
+            if delay is None:
+                delay = self.backoff * 2 ** attempt
+            print(f"⚠️ Translator request failed, retrying in {delay:.1f}s ({attempt + 1}/{self.retries})")
+            time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(value):
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+class EchoTranslator:
+    """Returns the input unchanged; for dry runs and checking the pipeline without credentials."""
+
+    def translate(self, texts, source, targets):
+        return {t: list(texts) for t in targets}
+
+
+def translator_from_env():
+    from dotenv import load_dotenv
+    load_dotenv()
+    key = os.getenv("TRANSLATOR_KEY")
+    region = os.getenv("TRANSLATOR_REGION")
+    if not key or not region:
+        return None
+    return AzureTextTranslator(key, region)
+
+
+# =========================
+# Pipeline
+# =========================
+
+class TranslationCache:
+    """Bounded LRU of text -> {target: translation}, so repeated phrases are translated once."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, text):
+        value = self._entries.get(text)
+        if value is not None:
+            self._entries.move_to_end(text)
+        return value
+
+    def put(self, text, value):
+        self._entries[text] = value
+        self._entries.move_to_end(text)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def output_path(input_path, target, out_dir):
+    """`2025-09-10_hi.txt` -> `<out_dir>/2025-09-10_<target>.txt`."""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    date = stem.rsplit("_", 1)[0]
+    return os.path.join(out_dir, f"{date}_{target}.txt")
+
+
+def overwrites_input(input_path, paths):
+    return os.path.abspath(input_path) in {os.path.abspath(p) for p in paths}
+
+
+def retranslate(input_path, targets, translator, source=None, out_dir="retranslated",
+                workers=4, batch_size=50, cache_size=10000):
+    """
+    Translate `input_path` into every language in `targets`.
+
+    Memory stays bounded regardless of file size: the transcript is streamed,
+    at most `workers * 2` batches are in flight, and the dedup cache is an LRU.
+    Returns a dict of run statistics.
+    """
+    paths = {t: output_path(input_path, t, out_dir) for t in targets}
+    if overwrites_input(input_path, paths.values()):
+        raise ValueError("Output would overwrite the input transcript; pick another --out-dir")
+    os.makedirs(out_dir, exist_ok=True)
+
+    cache = TranslationCache(cache_size)
+    stats = {"segments": 0, "translated": 0, "batches": 0}
+    outputs = {t: open(p, "w", encoding="utf-8") for t, p in paths.items()}
+
+    def run_batch(texts):
+        if not texts:
+            return {}
+        result = translator.translate(texts, source, targets)
+        return {text: {t: result[t][i] for t in targets} for i, text in enumerate(texts)}
+
+    def write_batch(segments, known, future):
+        known.update(future.result())
+        for text, value in known.items():
+            cache.put(text, value)
+        for timestamp, text in segments:
+            for t in targets:
+                outputs[t].write(f"{timestamp}{LINE_SEPARATOR}{known[text][t]}\n")
+        stats["segments"] += len(segments)
+
+    def submit(segments):
+        # Resolve cache hits now; entries may be evicted before this batch is written
+        known, pending, pending_set = {}, [], set()
+        for _, text in segments:
+            if text in known or text in pending_set:
+                continue
+            hit = cache.get(text)
+            if hit is not None:
+                known[text] = hit
+            else:
+                pending.append(text)
+                pending_set.add(text)
+        stats["translated"] += len(pending)
+        stats["batches"] += 1 if pending else 0
+        in_flight.append((segments, known, pool.submit(run_batch, pending)))
+
+    start = time.perf_counter()
+    in_flight = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batch = []
+            for segment in iter_utterances(iter_entries(input_path)):
+                batch.append(segment)
+                if len(batch) < batch_size:
+                    continue
+                submit(batch)
+                batch = []
+                # Write completed batches in order and cap how many are queued
+                while in_flight and (len(in_flight) >= workers * 2 or in_flight[0][2].done()):
+                    write_batch(*in_flight.popleft())
+            if batch:
+                submit(batch)
+            while in_flight:
+                write_batch(*in_flight.popleft())
+    finally:
+        for f in outputs.values():
+            f.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["segments_per_second"] = stats["segments"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["outputs"] = paths
+    return stats
+
+
+# =========================
+# Main
+# =========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-translate an archived transcript into other languages.")
+    parser.add_argument("transcript", help="Transcript file, e.g. 2025-09-10_hi.txt")
+    parser.add_argument("--to", nargs="+", required=True, dest="targets", help="Target language codes, e.g. en ta")
+    parser.add_argument("--from", dest="source", help="Source language code (default: detected by the service)")
+    parser.add_argument("--out-dir", default="retranslated")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--dry-run", action="store_true", help="Copy text through unchanged instead of calling Azure")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.transcript):
+        print(f"❌ Transcript not found: {args.transcript}")
+        return 1
+    if overwrites_input(args.transcript, (output_path(args.transcript, t, args.out_dir) for t in args.targets)):
+        print("❌ Output would overwrite the input transcript; pick another --out-dir")
+        return 1
+
+    translator = EchoTranslator() if args.dry_run else translator_from_env()
+    if translator is None:
+        print("❌ Missing Azure credentials in .env (TRANSLATOR_KEY / TRANSLATOR_REGION)")
+        return 1
+
+    stats = retranslate(
+        args.transcript, args.targets, translator,
+        source=args.source, out_dir=args.out_dir, workers=args.workers,
+        batch_size=args.batch_size, cache_size=args.cache_size,
+    )
+    for path in stats["outputs"].values():
+        print(f"📝 {path}")
+    print(f"✅ {stats['segments']} segments ({stats['translated']} unique sent for translation) "
+          f"in {stats['seconds']:.2f}s — {stats['segments_per_second']:.1f} segments/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
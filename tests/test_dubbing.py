@@ -0,0 +1,102 @@
+import time
+
+from dubbing import DubbingPipeline, SilentPlayer, ToneSynthesizer
+
+
+class RecordingSynthesizer(ToneSynthesizer):
+    """ToneSynthesizer that records when each synthesis started."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.started = {}
+
+    def synthesize(self, text, lang):
+        self.started[text] = time.monotonic()
+        return super().synthesize(text, lang)
+
+
+class RecordingPlayer(SilentPlayer):
+    """SilentPlayer that records when each playback started."""
+
+    def __init__(self):
+        super().__init__()
+        self.play_started = []
+
+    def play(self, audio):
+        self.play_started.append(time.monotonic())
+        super().play(audio)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_next_segment_synthesizes_while_current_plays():
+    synthesizer = RecordingSynthesizer(delay=0.2, seconds_per_word=0.2)
+    player = RecordingPlayer()
+    pipeline = DubbingPipeline(synthesizer, player)
+    try:
+        pipeline.submit("one two three four five", "hi")  # ~1 s of audio
+        assert wait_for(lambda: player.play_started)
+        time.sleep(0.2)
+        pipeline.submit("second", "hi")
+        assert wait_for(lambda: "second" in synthesizer.started)
+        # Synthesis of the second segment began during the first segment's playback
+        assert synthesizer.started["second"] < player.play_started[0] + 1.0
+        assert wait_for(lambda: pipeline.stats["played"] == 2)
+    finally:
+        pipeline.close()
+
+
+def test_stale_segments_are_dropped():
+    synthesizer = ToneSynthesizer(seconds_per_word=0.3)
+    player = SilentPlayer()
+    pipeline = DubbingPipeline(synthesizer, player, lookahead=1, max_lag_seconds=0.5, merge_max_chars=0)
+    try:
+        for i in range(6):
+            pipeline.submit(f"segment {i} a b", "hi")  # 1.2 s each, far more than the lag allows
+        assert wait_for(lambda: pipeline.stats["played"] + pipeline.stats["dropped"] == 6)
+        assert pipeline.stats["dropped"] > 0
+    finally:
+        pipeline.close()
+
+
+def test_queued_segments_are_merged_when_behind():
+    synthesizer = RecordingSynthesizer(seconds_per_word=0.3)
+    player = SilentPlayer()
+    pipeline = DubbingPipeline(synthesizer, player, lookahead=1)
+    try:
+        pipeline.submit("first", "hi")
+        assert wait_for(lambda: player.played)
+        for text in ("a", "b", "c"):
+            pipeline.submit(text, "hi")
+        assert wait_for(lambda: pipeline.stats["played"] >= 2)
+        assert pipeline.stats["merged"] >= 1
+        assert any(" " in text for text in synthesizer.started)
+    finally:
+        pipeline.close()
+
+
+def test_repeated_phrases_hit_the_cache():
+    pipeline = DubbingPipeline(ToneSynthesizer(seconds_per_word=0.05), SilentPlayer(), merge_max_chars=0)
+    try:
+        pipeline.submit("ठीक है", "hi")
+        assert wait_for(lambda: pipeline.stats["played"] == 1)
+        pipeline.submit("ठीक है", "hi")
+        assert wait_for(lambda: pipeline.stats["played"] == 2)
+        assert pipeline.stats["cache_hits"] == 1
+    finally:
+        pipeline.close()
+
+
+def test_close_does_not_wait_for_slow_synthesis():
+    pipeline = DubbingPipeline(ToneSynthesizer(delay=6), SilentPlayer())
+    pipeline.submit("slow", "hi")
+    pipeline.submit("queued behind it", "hi")
+    time.sleep(0.1)
+    start = time.monotonic()
+    pipeline.close(timeout=0.5)
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from retranslate import (
+    EchoTranslator, iter_entries, iter_utterances, main, request_chunks, retranslate,
+)
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "2025-09-10_hi.txt")
+
+
+def utterances(lines):
+    return [text for _, text in iter_utterances(lines)]
+
+
+def test_sample_transcript_collapses_to_final_utterances():
+    assert list(iter_utterances(iter_entries(SAMPLE))) == [
+        ("15:25:16", "यह आवेदन के लिए अंतिम परीक्षण है।"),
+        ("15:25:20", "ऐसा लगता है कि यह काम कर रहा है, लेकिन।"),
+        ("15:25:26", "ठीक है।"),
+        ("15:26:50", "सबको सुप्रभात।"),
+        ("15:26:52", "यह केवल एप्लिकेशन का परीक्षण करने के लिए है कि टॉगल बटन काम करता है या नहीं।"),
+        ("15:26:58", "लेकिन जैसा कि आप देख सकते हैं कि यह काम कर रहा है और अगर मैं सिर्फ इस बटन पर "
+                     "क्लिक करता हूं तो यह अभी भी है।"),
+    ]
+
+
+def test_words_added_before_a_partial_are_one_utterance():
+    assert utterances([
+        ("15:26:50", "सुप्रभात"),
+        ("15:26:50", "सबको सुप्रभात"),
+        ("15:26:50", "सबको सुप्रभात।"),
+    ]) == ["सबको सुप्रभात।"]
+
+
+def test_loose_rewrite_right_after_a_partial_is_one_utterance():
+    assert utterances([
+        ("15:25:16", "यहन"),
+        ("15:25:17", "यह एक फाइनल है"),
+        ("15:25:17", "यह अंतिम टेस्ट है"),
+        ("15:25:18", "यह आवेदन के लिए अंतिम परीक्षण है।"),
+    ]) == ["यह आवेदन के लिए अंतिम परीक्षण है।"]
+
+
+@pytest.mark.parametrize("first, second", [
+    ("यह पहला वाक्य", "यह दूसरा वाक्य है।"),
+    ("the first sentence", "then another one."),
+    ("Hello there", "Good morning all."),
+])
+def test_unpunctuated_final_followed_by_new_sentence_is_kept(first, second):
+    assert utterances([("10:00:00", first), ("10:00:02", second)]) == [first, second]
+
+
+def test_long_silence_breaks_the_chain():
+    assert utterances([("10:00:00", "ऐसा लगता है"), ("10:00:10", "ऐसा लगता है कि")]) == [
+        "ऐसा लगता है", "ऐसा लगता है कि"]
+
+
+def test_request_chunks_respect_characters_across_targets():
+    chunks = list(request_chunks(["x" * 1000] * 120, target_count=3, max_chars=50000))
+    assert sum(len(c) for c in chunks) == 120
+    assert all(len(c) * 1000 * 3 <= 50000 for c in chunks)
+
+
+def test_retranslate_writes_deduplicated_aligned_output(tmp_path):
+    stats = retranslate(SAMPLE, ["en", "ta"], EchoTranslator(), out_dir=str(tmp_path), batch_size=2)
+    assert stats["segments"] == 6
+    lines = (tmp_path / "2025-09-10_en.txt").read_text(encoding="utf-8").splitlines()
+    assert lines[3] == "15:26:50 → सबको सुप्रभात।"
+    assert (tmp_path / "2025-09-10_ta.txt").exists()
+
+
+def test_main_refuses_to_overwrite_input(tmp_path, capsys):
+    transcript = tmp_path / "2025-09-10_hi.txt"
+    transcript.write_text("15:25:26 → ठीक है।\n", encoding="utf-8")
+    assert main([str(transcript), "--to", "hi", "--out-dir", str(tmp_path), "--dry-run"]) == 1
+    assert "❌" in capsys.readouterr().out